@@ -1,11 +1,26 @@
 import os
 import logging
 import asyncio
+import concurrent.futures
+import contextlib
+import copy
+import heapq
+import queue
+import secrets
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
 from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram.error import RetryAfter
+from telegram.request import HTTPXRequest
 from telegram.ext import Application, CommandHandler, MessageHandler, CallbackQueryHandler, ContextTypes, filters
 import yt_dlp
 import re
-import traceback
 
 # Setup logging
 logging.basicConfig(
@@ -14,31 +29,29 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-# Get bot token from environment
-BOT_TOKEN = os.getenv("BOT_TOKEN")
-if not BOT_TOKEN:
-    logger.error("❌ ERROR: BOT_TOKEN not found in environment!")
-    logger.error("Set it in Railway: Settings → Variables")
-    exit(1)
-
 # Create downloads folder
 os.makedirs("downloads", exist_ok=True)
 
-class SimpleVideoBot:
-    def __init__(self):
-        self.ydl_opts = {
-            'quiet': True,
-            'no_warnings': True,
-            'outtmpl': 'downloads/%(title)s.%(ext)s',
-        }
-    
-    async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Simple start command"""
-        user = update.effective_user
-        welcome_text = f"""
+# Max concurrent yt-dlp jobs (also the number of pooled YoutubeDL instances)
+MAX_JOBS = 4
+
+# Extracted video info is reused for 10 minutes
+INFO_CACHE_TTL = 600
+INFO_CACHE_SIZE = 256
+
+SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
+# Keyboard tokens kept for callbacks (callback_data is limited to 64 bytes)
+TOKEN_MAP_SIZE = 1024
+
+# HTTPS URL with a real hostname; rejects obvious garbage before yt-dlp runs
+URL_RE = re.compile(r'^https://(?:[\w-]+\.)+[a-z]{2,}(?:[:/?#]\S*)?$', re.IGNORECASE)
+
+# Static command replies
+START_TEMPLATE = """
 🤖 *Simple Video Downloader Bot*
 
-👋 Hello {user.first_name}!
+👋 Hello {name}!
 
 📥 *Send me any video URL from:*
 • YouTube
@@ -61,11 +74,8 @@ class SimpleVideoBot:
 
 🔥 *Note:* Bot runs on Railway cloud
 """
-        await update.message.reply_text(welcome_text, parse_mode='Markdown')
-    
-    async def help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """Help command"""
-        help_text = """
+
+HELP_TEXT = """
 📚 *Help Guide*
 
 🔗 *Supported Sites:*
@@ -93,11 +103,8 @@ class SimpleVideoBot:
 - Check if video is available
 - Contact if persistent issues
 """
-        await update.message.reply_text(help_text, parse_mode='Markdown')
-    
-    async def about(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
-        """About command"""
-        about_text = """
+
+ABOUT_TEXT = """
 ℹ️ *About This Bot*
 
 🤖 *Simple Video Downloader*
@@ -118,43 +125,211 @@ Platform: Railway Cloud
 
 📝 *Note:* This bot is for educational purposes only.
 """
-        await update.message.reply_text(about_text, parse_mode='Markdown')
+
+def _do_download(ydl: yt_dlp.YoutubeDL, url: str, info: dict = None):
+    """Run a blocking yt-dlp download (call from a worker thread)"""
+    if info is not None:
+        # Reuse already extracted metadata instead of re-running the extractor.
+        # Strip the previous format selection (requested_formats etc.) so this
+        # job's format is applied; sanitize_info also returns a fresh copy.
+        info = ydl.process_ie_result(ydl.sanitize_info(dict(info), remove_private_keys=True), download=True)
+    else:
+        info = ydl.extract_info(url, download=True)
+    # Final path after merging/post-processing, as reported by yt-dlp
+    downloads = info.get('requested_downloads')
+    if downloads and downloads[0].get('filepath'):
+        filename = downloads[0]['filepath']
+    else:
+        filename = ydl.prepare_filename(info)
+    # Stat in the worker thread too, so the event loop never touches the disk
+    return info, filename, os.stat(filename).st_size
+
+async def _convert_to_mp3(src: str) -> str:
+    """Transcode src to MP3 in an ffmpeg subprocess without blocking the event loop"""
+    dst = os.path.splitext(src)[0] + '.mp3'
+    if dst == src:
+        return src
+    proc = await asyncio.create_subprocess_exec(
+        'ffmpeg', '-y', '-loglevel', 'error', '-i', src, '-vn', '-acodec', 'libmp3lame', '-b:a', '192k', dst,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE
+    )
+    try:
+        _, stderr = await proc.communicate()
+    finally:
+        # Don't leave ffmpeg running if we were cancelled (its input is about to be deleted)
+        if proc.returncode is None:
+            proc.kill()
+            await proc.wait()
+    if proc.returncode != 0:
+        raise RuntimeError(f"ffmpeg exited with code {proc.returncode}: {stderr.decode(errors='replace').strip()}")
+    return dst
+
+class SimpleVideoBot:
+    def __init__(self):
+        self.ydl_opts = {
+            'quiet': True,
+            'no_warnings': True,
+            'outtmpl': 'downloads/%(title)s.%(ext)s',
+            # Fetch HLS/DASH fragments in parallel and retry flaky ones
+            'concurrent_fragment_downloads': 8,
+            'http_chunk_size': 10 * 1024 * 1024,
+            'retries': 3,
+            'fragment_retries': 5,
+        }
+        # yt-dlp is blocking, so run it off the event loop
+        self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=8)
+        # Cap concurrent yt-dlp jobs overall and to one per user
+        self.global_sem = asyncio.Semaphore(MAX_JOBS)
+        # ffmpeg is CPU-bound, so run at most one transcode per core
+        self.transcode_sem = asyncio.Semaphore(os.cpu_count() or 1)
+        # YoutubeDL isn't thread-safe, so each job borrows its own instance
+        self._ydl_pool = queue.SimpleQueue()
+        for _ in range(MAX_JOBS):
+            self._ydl_pool.put(yt_dlp.YoutubeDL(copy.deepcopy(self.ydl_opts)))
+        self.user_sems: dict[int, asyncio.Semaphore] = {}
+        # url -> (extracted at, yt-dlp info), shared by worker threads
+        self.info_cache: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+        self._cache_lock = threading.Lock()
+        # keyboard token -> (url, format ids offered on that keyboard)
+        self.token_map: OrderedDict[str, tuple[str, list[str]]] = OrderedDict()
+        # chat id -> time of the last progress edit, cleared by the final edit
+        self._last_edit: dict[int, float] = {}
+    
+    async def start(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Simple start command"""
+        user = update.effective_user
+        await update.message.reply_text(START_TEMPLATE.format(name=user.first_name), parse_mode='Markdown')
+    
+    async def help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Help command"""
+        await update.message.reply_text(HELP_TEXT, parse_mode='Markdown')
+    
+    async def about(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """About command"""
+        await update.message.reply_text(ABOUT_TEXT, parse_mode='Markdown')
+    
+    @contextlib.contextmanager
+    def borrow_ydl(self, format_spec: str = None, outtmpl: str = None):
+        """Borrow a pooled YoutubeDL set up for one job"""
+        ydl = self._ydl_pool.get()
+        try:
+            # format_selector is built once in YoutubeDL.__init__, so rebuild it per job
+            ydl.format_selector = ydl.build_format_selector(format_spec) if format_spec else None
+            ydl.params['outtmpl']['default'] = outtmpl or self.ydl_opts['outtmpl']
+            yield ydl
+        finally:
+            self._ydl_pool.put(ydl)
+    
+    def download(self, url: str, format_spec: str, workdir: str, info: dict = None):
+        """Download url into workdir with a pooled YoutubeDL (call from a worker thread)"""
+        with self.borrow_ydl(format_spec, os.path.join(workdir, '%(title)s.%(ext)s')) as ydl:
+            return _do_download(ydl, url, info)
+    
+    def cached_info(self, url: str):
+        """Get cached yt-dlp info for url, or None if missing/expired"""
+        with self._cache_lock:
+            entry = self.info_cache.get(url)
+            if entry is None:
+                return None
+            if time.monotonic() - entry[0] >= INFO_CACHE_TTL:
+                del self.info_cache[url]
+                return None
+            self.info_cache.move_to_end(url)
+            return entry[1]
+    
+    def extract_info(self, url: str):
+        """Extract video info, using the cache when possible"""
+        info = self.cached_info(url)
+        if info is None:
+            with self.borrow_ydl() as ydl:
+                info = ydl.extract_info(url, download=False)
+            with self._cache_lock:
+                self.info_cache[url] = (time.monotonic(), info)
+                self.info_cache.move_to_end(url)
+                while len(self.info_cache) > INFO_CACHE_SIZE:
+                    self.info_cache.popitem(last=False)
+        return info
     
     def get_video_info(self, url: str):
         """Get video information"""
         try:
-            with yt_dlp.YoutubeDL(self.ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=False)
-                
-                formats = []
-                for fmt in info.get('formats', []):
-                    if fmt.get('vcodec') != 'none':  # Only video formats
-                        format_data = {
-                            'format_id': fmt['format_id'],
-                            'ext': fmt.get('ext', 'mp4'),
-                            'height': fmt.get('height', 0),
-                            'width': fmt.get('width', 0),
-                            'filesize': fmt.get('filesize', 0),
-                            'quality': f"{fmt.get('height', 0)}p" if fmt.get('height') else 'N/A'
-                        }
-                        formats.append(format_data)
-                
-                # Sort by quality
-                formats.sort(key=lambda x: x.get('height', 0), reverse=True)
-                
-                return {
-                    'success': True,
-                    'title': info.get('title', 'Unknown'),
-                    'duration': info.get('duration', 0),
-                    'thumbnail': info.get('thumbnail', ''),
-                    'uploader': info.get('uploader', 'Unknown'),
-                    'formats': formats[:6],  # Max 6 formats
-                    'webpage_url': url,
-                }
+            info = self.extract_info(url)
+            
+            # Keep only the 6 highest video formats without sorting them all
+            top = heapq.nlargest(
+                6,
+                (f for f in info.get('formats') or () if f.get('vcodec') != 'none'),
+                key=lambda f: f.get('height') or 0
+            )
+            formats = [{
+                'format_id': fmt['format_id'],
+                'ext': fmt.get('ext', 'mp4'),
+                'height': fmt.get('height', 0),
+                'width': fmt.get('width', 0),
+                'filesize': fmt.get('filesize', 0),
+                'quality': f"{fmt.get('height', 0)}p" if fmt.get('height') else 'N/A'
+            } for fmt in top]
+            
+            return {
+                'success': True,
+                'title': info.get('title', 'Unknown'),
+                'duration': info.get('duration', 0),
+                'thumbnail': info.get('thumbnail', ''),
+                'uploader': info.get('uploader', 'Unknown'),
+                'formats': formats,
+                'webpage_url': url,
+            }
         except Exception as e:
-            logger.error(f"Video info error: {e}")
+            logger.error("Video info error: %s", e)
             return {'success': False, 'error': str(e)}
     
+    def make_token(self, url: str, format_ids: list[str]) -> str:
+        """Store a keyboard's url/formats under a short token for use in callback_data"""
+        tok = secrets.token_urlsafe(6)
+        self.token_map[tok] = (url, format_ids)
+        while len(self.token_map) > TOKEN_MAP_SIZE:
+            self.token_map.popitem(last=False)
+        return tok
+    
+    async def safe_edit(self, msg, text: str, final: bool = False, **kwargs):
+        """Edit a status message, dropping progress edits sent <1s apart per chat"""
+        if final:
+            # The status message is done, so stop tracking this chat
+            self._last_edit.pop(msg.chat_id, None)
+            try:
+                await msg.edit_text(text, **kwargs)
+            except RetryAfter as e:
+                # The final status must land, so wait and retry once
+                await asyncio.sleep(e.retry_after)
+                await msg.edit_text(text, **kwargs)
+            return
+        
+        now = time.monotonic()
+        if now - self._last_edit.get(msg.chat_id, 0) < 1.0:
+            return
+        self._last_edit[msg.chat_id] = now
+        try:
+            await msg.edit_text(text, **kwargs)
+        except RetryAfter:
+            # Progress edits are best-effort; don't stall the job waiting out the limit
+            pass
+    
+    @contextlib.asynccontextmanager
+    async def user_slot(self, user_id: int):
+        """Hold the user's single job slot; yields False if they already have a job running"""
+        user_sem = self.user_sems.setdefault(user_id, asyncio.Semaphore(1))
+        if user_sem.locked():
+            yield False
+            return
+        try:
+            async with user_sem:
+                yield True
+        finally:
+            # Drop idle semaphores so the dict doesn't grow with every user ever seen
+            if not user_sem.locked() and self.user_sems.get(user_id) is user_sem:
+                del self.user_sems[user_id]
+    
     def format_duration(self, seconds: int) -> str:
         """Format duration nicely"""
         if seconds < 60:
@@ -166,49 +341,62 @@ Platform: Railway Cloud
     
     def format_size(self, bytes_size: int) -> str:
         """Format file size"""
-        if bytes_size == 0:
+        if not bytes_size:
             return "Unknown"
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if bytes_size < 1024.0:
-                return f"{bytes_size:.1f} {unit}"
-            bytes_size /= 1024.0
-        return f"{bytes_size:.1f} TB"
+        unit = min((int(bytes_size).bit_length() - 1) // 10, 4)
+        return f"{bytes_size / (1 << (unit * 10)):.1f} {SIZE_UNITS[unit]}"
     
     async def handle_url(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Handle video URL"""
         url = update.message.text.strip()
         
         # Basic URL validation
-        if not re.match(r'^https?://', url):
-            await update.message.reply_text("❌ Please send a valid URL starting with http:// or https://")
+        if not URL_RE.match(url):
+            await update.message.reply_text("❌ Please send a valid URL starting with https://")
             return
         
-        # Show processing message
-        msg = await update.message.reply_text("🔍 *Checking video...*", parse_mode='Markdown')
-        
-        # Get video info
-        video_info = self.get_video_info(url)
+        async with self.user_slot(update.effective_user.id) as acquired:
+            if not acquired:
+                await update.message.reply_text("⏳ You're already downloading something, please wait...")
+                return
+            
+            # Show processing message while extraction is already running
+            ack_task = asyncio.create_task(
+                update.message.reply_text("🔍 *Checking video...*", parse_mode='Markdown')
+            )
+            
+            # Get video info (in a worker thread so other updates keep flowing)
+            loop = asyncio.get_running_loop()
+            async with self.global_sem:
+                video_info = await loop.run_in_executor(self._pool, self.get_video_info, url)
+            msg = await ack_task
         
         if not video_info.get('success'):
             await msg.edit_text(f"❌ Error: {video_info.get('error', 'Failed to get video info')}")
             return
         
-        # Create keyboard with formats
+        # Formats offered on this keyboard; index 0 is best quality
+        qualities = []
+        format_ids = ['best']
+        for fmt in video_info['formats']:
+            quality = fmt.get('quality', 'N/A')
+            if quality != 'N/A':
+                qualities.append(f"📹 {quality} ({self.format_size(fmt.get('filesize', 0))})")
+                format_ids.append(fmt['format_id'])
+        
+        # Create keyboard with formats; one token covers every button on it
+        tok = self.make_token(url, format_ids)
         keyboard = []
         
         # Best quality option
-        keyboard.append([InlineKeyboardButton("⚡ Best Quality", callback_data=f"dl:{url}:best")])
+        keyboard.append([InlineKeyboardButton("⚡ Best Quality", callback_data=f"d:{tok}:0")])
         
         # Audio only option
-        keyboard.append([InlineKeyboardButton("🎵 Audio Only (MP3)", callback_data=f"audio:{url}")])
+        keyboard.append([InlineKeyboardButton("🎵 Audio Only (MP3)", callback_data=f"a:{tok}")])
         
         # Video quality options
-        for fmt in video_info['formats']:
-            quality = fmt.get('quality', 'N/A')
-            size = self.format_size(fmt.get('filesize', 0))
-            if quality != 'N/A':
-                text = f"📹 {quality} ({size})"
-                keyboard.append([InlineKeyboardButton(text, callback_data=f"dl:{url}:{fmt['format_id']}")])
+        for i, text in enumerate(qualities, start=1):
+            keyboard.append([InlineKeyboardButton(text, callback_data=f"d:{tok}:{i}")])
         
         reply_markup = InlineKeyboardMarkup(keyboard)
         
@@ -225,16 +413,19 @@ Platform: Railway Cloud
         
         # Send with thumbnail if available
         if video_info.get('thumbnail'):
-            try:
-                await update.message.reply_photo(
+            photo_result, _ = await asyncio.gather(
+                update.message.reply_photo(
                     photo=video_info['thumbnail'],
                     caption=info_text,
                     reply_markup=reply_markup,
                     parse_mode='Markdown'
-                )
-                await msg.delete()
-            except:
-                await msg.edit_text(info_text, reply_markup=reply_markup, parse_mode='Markdown')
+                ),
+                msg.delete(),
+                return_exceptions=True
+            )
+            if isinstance(photo_result, Exception):
+                # Placeholder is gone, so send the info as a new message
+                await update.message.reply_text(info_text, reply_markup=reply_markup, parse_mode='Markdown')
         else:
             await msg.edit_text(info_text, reply_markup=reply_markup, parse_mode='Markdown')
     
@@ -243,136 +434,126 @@ Platform: Railway Cloud
         query = update.callback_query
         await query.answer()
         
-        data = query.data
-        
-        if data.startswith("dl:"):
-            _, url, format_id = data.split(":", 2)
-            await self.download_video(query, url, format_id)
+        kind, _, rest = query.data.partition(":")
+        tok, _, index = rest.partition(":")
+        if tok not in self.token_map:
+            await query.message.reply_text("❌ This button has expired, please send the URL again.")
+            return
+        url, format_ids = self.token_map[tok]
         
-        elif data.startswith("audio:"):
-            url = data.split(":", 1)[1]
-            await self.download_audio(query, url)
+        async with self.user_slot(query.from_user.id) as acquired:
+            if not acquired:
+                await query.message.reply_text("⏳ You're already downloading something, please wait...")
+                return
+            
+            if kind == "d" and index.isdigit() and int(index) < len(format_ids):
+                await self.download_video(query, url, format_ids[int(index)], info=self.cached_info(url))
+            
+            elif kind == "a":
+                await self.download_audio(query, url, info=self.cached_info(url))
     
-    async def download_video(self, query, url: str, format_id: str):
+    async def download_video(self, query, url: str, format_id: str, info: dict = None):
         """Download video"""
         msg = await query.message.reply_text("⏬ *Downloading video...*", parse_mode='Markdown')
+        # Each download gets its own folder so concurrent jobs never share files
+        workdir = tempfile.mkdtemp(prefix="dl_", dir="downloads")
         
         try:
-            # Download options
-            ydl_opts = {
-                'format': format_id,
-                'outtmpl': 'downloads/%(title)s.%(ext)s',
-                'quiet': True,
-            }
+            async with self.global_sem:
+                # Reuses the extracted info if we have it, otherwise extracts again
+                info, filename, file_size = await asyncio.to_thread(self.download, url, format_id, workdir, info)
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                filename = ydl.prepare_filename(info)
-                
-                # Check if file exists (yt-dlp might change extension)
-                if not os.path.exists(filename):
-                    # Try common extensions
-                    for ext in ['.webm', '.mkv', '.mp4', '.m4a']:
-                        alt_file = filename.rsplit('.', 1)[0] + ext
-                        if os.path.exists(alt_file):
-                            filename = alt_file
-                            break
-            
-            # Get file size
-            file_size = os.path.getsize(filename)
-            
-            await msg.edit_text("📤 *Uploading to Telegram...*")
+            await self.safe_edit(msg, "📤 *Uploading to Telegram...*", parse_mode='Markdown')
             
             # Send video (Telegram limit: 50MB for bots, 2GB for premium)
             try:
-                with open(filename, 'rb') as f:
-                    await query.message.reply_video(
-                        video=f,
-                        caption=f"✅ *Download Complete!*\n📹 {info.get('title', 'Video')}\n📦 Size: {self.format_size(file_size)}",
-                        parse_mode='Markdown',
-                        supports_streaming=True,
-                        read_timeout=300,
-                        write_timeout=300,
-                        connect_timeout=300
-                    )
+                await query.message.reply_video(
+                    video=Path(filename),
+                    caption=f"✅ *Download Complete!*\n📹 {info.get('title', 'Video')}\n📦 Size: {self.format_size(file_size)}",
+                    parse_mode='Markdown',
+                    supports_streaming=True,
+                    read_timeout=300,
+                    write_timeout=300,
+                    connect_timeout=300
+                )
                 
-                await msg.delete()
+                await self.safe_edit(msg, "✅ Done", final=True)
                 
             except Exception as e:
                 if "File too large" in str(e):
-                    await msg.edit_text(f"❌ File too large ({self.format_size(file_size)}). Telegram bot limit is 50MB.")
+                    await self.safe_edit(msg, f"❌ File too large ({self.format_size(file_size)}). Telegram bot limit is 50MB.", final=True)
                 else:
-                    await msg.edit_text(f"❌ Upload error: {str(e)}")
-            
-            # Cleanup
-            try:
-                os.remove(filename)
-            except:
-                pass
+                    await self.safe_edit(msg, f"❌ Upload error: {str(e)}", final=True)
             
         except Exception as e:
-            logger.error(f"Download error: {traceback.format_exc()}")
-            await msg.edit_text(f"❌ Download failed: {str(e)}")
+            logger.exception("Download failed")
+            await self.safe_edit(msg, f"❌ Download failed: {str(e)}", final=True)
+        finally:
+            # Cleanup
+            shutil.rmtree(workdir, ignore_errors=True)
     
-    async def download_audio(self, query, url: str):
+    async def download_audio(self, query, url: str, info: dict = None):
         """Download audio only"""
         msg = await query.message.reply_text("🎵 *Extracting audio...*", parse_mode='Markdown')
+        workdir = tempfile.mkdtemp(prefix="dl_", dir="downloads")
         
         try:
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-                'outtmpl': 'downloads/%(title)s.%(ext)s',
-                'quiet': True,
-            }
+            async with self.global_sem:
+                # Reuses the extracted info if we have it, otherwise extracts again
+                info, filename, _ = await asyncio.to_thread(self.download, url, 'bestaudio/best', workdir, info)
             
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info = ydl.extract_info(url, download=True)
-                filename = ydl.prepare_filename(info)
-                filename = filename.rsplit('.', 1)[0] + '.mp3'
+            # Transcode outside the download slot so other jobs keep downloading meanwhile
+            async with self.transcode_sem:
+                filename = await _convert_to_mp3(filename)
+            file_size = (await asyncio.to_thread(os.stat, filename)).st_size
             
-            file_size = os.path.getsize(filename)
+            await self.safe_edit(msg, "📤 *Uploading audio...*", parse_mode='Markdown')
             
-            await msg.edit_text("📤 *Uploading audio...*")
+            await query.message.reply_audio(
+                audio=Path(filename),
+                caption=f"✅ *Audio Extracted!*\n🎵 {info.get('title', 'Audio')}\n📦 Size: {self.format_size(file_size)}",
+                parse_mode='Markdown'
+            )
             
-            with open(filename, 'rb') as f:
-                await query.message.reply_audio(
-                    audio=f,
-                    caption=f"✅ *Audio Extracted!*\n🎵 {info.get('title', 'Audio')}\n📦 Size: {self.format_size(file_size)}",
-                    parse_mode='Markdown'
-                )
-            
-            await msg.delete()
-            
-            # Cleanup
-            try:
-                os.remove(filename)
-            except:
-                pass
+            await self.safe_edit(msg, "✅ Done", final=True)
             
         except Exception as e:
-            logger.error(f"Audio error: {traceback.format_exc()}")
-            await msg.edit_text(f"❌ Audio extraction failed: {str(e)}")
+            logger.exception("Audio extraction failed")
+            await self.safe_edit(msg, f"❌ Audio extraction failed: {str(e)}", final=True)
+        finally:
+            # Cleanup
+            shutil.rmtree(workdir, ignore_errors=True)
 
 def main():
     """Start the bot"""
+    # Get bot token from environment
+    token = os.environ.get("BOT_TOKEN")
+    if not token:
+        logger.error("❌ ERROR: BOT_TOKEN not found in environment!")
+        logger.error("Set it in Railway: Settings → Variables")
+        sys.exit(1)
+    
     print(f"""
 ╔══════════════════════════════════╗
 ║     SIMPLE VIDEO DOWNLOADER      ║
 ║         🤖 BOT v1.0             ║
 ╚══════════════════════════════════╝
     
-✅ Token loaded: {BOT_TOKEN[:15]}...
+✅ Token loaded: {token[:15]}...
 ✅ Downloads folder ready
 ✅ Starting bot on Railway...
     """)
     
-    # Create application
-    application = Application.builder().token(BOT_TOKEN).build()
+    # Create application, multiplexing Bot API calls over persistent HTTP/2 connections
+    application = (
+        Application.builder()
+        .token(token)
+        .request(HTTPXRequest(http_version="2", connection_pool_size=32))
+        .get_updates_request(HTTPXRequest(http_version="2"))
+        # Handle updates concurrently so one user's download doesn't hold up everyone else
+        .concurrent_updates(True)
+        .build()
+    )
     
     # Initialize bot
     bot = SimpleVideoBot()
@@ -391,14 +572,26 @@ def main():
     # Handle button clicks
     application.add_handler(CallbackQueryHandler(bot.button_callback))
     
-    # Start polling
     print("🤖 Bot is running...")
     print("📱 Send /start to your bot on Telegram")
     
-    application.run_polling(
-        drop_pending_updates=True,
-        allowed_updates=Update.ALL_TYPES
-    )
+    # Use a webhook behind Railway's public HTTPS domain, poll when running locally
+    public_domain = os.environ.get("RAILWAY_PUBLIC_DOMAIN")
+    if public_domain:
+        application.run_webhook(
+            listen="0.0.0.0",
+            port=int(os.environ.get("PORT", 8080)),
+            url_path=token,
+            webhook_url=f"https://{public_domain}/{token}",
+            secret_token=os.environ.get("WEBHOOK_SECRET"),
+            allowed_updates=Update.ALL_TYPES,
+            drop_pending_updates=True
+        )
+    else:
+        application.run_polling(
+            drop_pending_updates=True,
+            allowed_updates=Update.ALL_TYPES
+        )
 
 if __name__ == '__main__':
     main()
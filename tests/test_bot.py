@@ -0,0 +1,98 @@
+import os
+import shutil
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+import bot
+
+
+def _fmt(format_id, height, vcodec, acodec, ext):
+    return {
+        'format_id': format_id,
+        'url': f'https://example.com/{format_id}',
+        'ext': ext,
+        'height': height,
+        'vcodec': vcodec,
+        'acodec': acodec,
+        'protocol': 'https',
+    }
+
+
+class CachedInfoDownloadTest(unittest.TestCase):
+    """Downloads from cached info must honour the requested format"""
+
+    def setUp(self):
+        self.bot = bot.SimpleVideoBot()
+        raw = {
+            'id': 'x',
+            'title': 'clip',
+            'extractor': 'test',
+            'extractor_key': 'Test',
+            'webpage_url': 'https://example.com/x',
+            'formats': [
+                _fmt('v360', 360, 'avc1', 'none', 'mp4'),
+                _fmt('v720', 720, 'avc1', 'none', 'mp4'),
+                _fmt('a', None, 'none', 'mp4a', 'm4a'),
+            ],
+        }
+        # Same shape as what extract_info(download=False) puts in the cache
+        with self.bot.borrow_ydl() as ydl:
+            self.info = ydl.process_ie_result(raw, download=False)
+        self.assertEqual(self.info['format_id'], 'v720+a')
+
+    def stub_process_info(self, workdir):
+        """Patch YoutubeDL.process_info to record formats instead of downloading"""
+        downloaded = []
+
+        def process_info(ydl, info_dict):
+            requested = info_dict.get('requested_formats') or []
+            downloaded.append((info_dict['format_id'], [f['format_id'] for f in requested]))
+            info_dict['filepath'] = os.path.join(workdir, 'out')
+            open(info_dict['filepath'], 'w').close()
+
+        patcher = mock.patch.object(bot.yt_dlp.YoutubeDL, 'process_info', process_info)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return downloaded
+
+    def make_workdir(self):
+        workdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, workdir, ignore_errors=True)
+        return workdir
+
+    def download(self, format_spec):
+        """Run _do_download on the cached info, returning what process_info was asked for"""
+        workdir = self.make_workdir()
+        downloaded = self.stub_process_info(workdir)
+        with self.bot.borrow_ydl(format_spec, os.path.join(workdir, '%(title)s.%(ext)s')) as ydl:
+            bot._do_download(ydl, self.info['webpage_url'], self.info)
+        return downloaded
+
+    def test_single_video_format(self):
+        self.assertEqual(self.download('v360'), [('v360', [])])
+
+    def test_audio_only(self):
+        self.assertEqual(self.download('bestaudio/best'), [('a', [])])
+
+    def test_cached_info_is_not_modified(self):
+        self.download('v360')
+        self.assertEqual(self.info['format_id'], 'v720+a')
+
+    def test_button_path_uses_cache(self):
+        # button_callback passes cached_info(url) into download()
+        url = self.info['webpage_url']
+        self.bot.info_cache[url] = (time.monotonic(), self.info)
+        workdir = self.make_workdir()
+        downloaded = self.stub_process_info(workdir)
+        for format_spec in ('v360', 'bestaudio/best'):
+            self.bot.download(url, format_spec, workdir, self.bot.cached_info(url))
+        self.assertEqual(downloaded, [('v360', []), ('a', [])])
+
+
+if __name__ == '__main__':
+    unittest.main()